@@ -0,0 +1,183 @@
+# /usr/bin/env python3
+import json
+import os
+import select
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+from ginear.index import lookup_identifier
+from ginear.paging import MAX_PAGE_SIZE
+from ginear.queries import (
+    BATCH_SIZE,
+    create_issue,
+    get_issues_batch,
+    identifier_filter,
+    search_filter,
+)
+from ginear.utils import switch_branch
+
+PROJECT_ID = os.environ.get("PROJECT_ID")
+
+# Commands that only read issues. Consecutive lookups share combined requests.
+LOOKUP_COMMANDS = ("search", "show", "attach")
+
+
+def _lookup(command: dict[str, Any]) -> tuple[dict[str, Any], int]:
+    if command["cmd"] == "search":
+        limit = int(command.get("limit", 25))
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        limit = min(limit, MAX_PAGE_SIZE)
+        return search_filter(command.get("query")), limit
+    return identifier_filter(str(command["identifier"])), 1
+
+
+def _response(command: dict[str, Any], **fields: Any) -> str:
+    response = {"id": command["id"]} if "id" in command else {}
+    return json.dumps({**response, **fields})
+
+
+def _finish_lookup(command: dict[str, Any], issues: list[dict[str, Any]]) -> str:
+    if command["cmd"] == "search":
+        return _response(command, ok=True, result=issues)
+
+    if not issues:
+        return _response(
+            command, ok=False, error=f"Issue '{command['identifier']}' not found."
+        )
+    issue = issues[0]
+    if command["cmd"] == "attach" and not command.get("no_switch", False):
+        # git's messages would end up between the responses on stdout
+        switch_branch(issue["branchName"], stdout=sys.stderr)
+    return _response(command, ok=True, result=issue)
+
+
+def _run_create(command: dict[str, Any]) -> str:
+    issue = create_issue(
+        title=command["title"],
+        description=command.get("description", ""),
+        project_id=command.get("project_id", PROJECT_ID),
+        switch=False,
+        quiet=True,
+    )
+    if issue is None:
+        return _response(command, ok=False, error="Issue creation failed.")
+    if not command.get("no_switch", False):
+        switch_branch(issue["branchName"], stdout=sys.stderr)
+    return _response(command, ok=True, result=issue)
+
+
+class StdinLines:
+    """
+    Lines of a file descriptor, read without Python's buffering so that `ready`
+    can tell whether the next line is available without blocking.
+    """
+
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+        self.buffer = b""
+        self.eof = False
+
+    def __iter__(self) -> Iterator[str]:
+        while True:
+            while b"\n" not in self.buffer and not self.eof:
+                chunk = os.read(self.fd, 65536)
+                self.eof = not chunk
+                self.buffer += chunk
+            if not self.buffer:
+                return
+            line, _, self.buffer = self.buffer.partition(b"\n")
+            yield line.decode()
+
+    def ready(self) -> bool:
+        if b"\n" in self.buffer or self.eof:
+            return True
+        readable, _, _ = select.select([self.fd], [], [], 0)
+        return bool(readable)
+
+
+def run_batch(
+    lines: Iterable[str],
+    write: Callable[[str], None],
+    ready: Callable[[], bool] = lambda: True,
+) -> None:
+    """
+    Execute NDJSON commands and write one NDJSON response per command, in order.
+
+    Lookups are held back while more input is `ready`, until a `create`, EOF or
+    BATCH_SIZE pending lookups, and then resolved together so that N lookups cost
+    a handful of requests. A client waiting for a reply gets it right away.
+    """
+    pending: list[dict[str, Any]] = []
+
+    def flush() -> None:
+        lookups: list[tuple[dict[str, Any], int] | None] = []
+        errors: dict[int, str] = {}
+        issues_by_index: dict[int, list[dict[str, Any]]] = {}
+        for i, command in enumerate(pending):
+            cached_issue = (
+                lookup_identifier(str(command["identifier"]))
+                if command["cmd"] != "search" and "identifier" in command
+                else None
+            )
+            if cached_issue is not None:
+                lookups.append(None)
+                issues_by_index[i] = [cached_issue]
+                continue
+            try:
+                lookups.append(_lookup(command))
+            except (KeyError, ValueError, TypeError) as e:
+                lookups.append(None)
+                errors[i] = f"Invalid command: {e}"
+
+        valid = [i for i, lookup in enumerate(lookups) if lookup is not None]
+        try:
+            results = get_issues_batch(
+                [lookup for lookup in lookups if lookup is not None]
+            )
+            issues_by_index.update(zip(valid, results))
+        except Exception:
+            # Retry one by one, so a failing lookup only fails its own command
+            for i in valid:
+                lookup = lookups[i]
+                assert lookup is not None
+                try:
+                    issues_by_index[i] = get_issues_batch([lookup])[0]
+                except Exception as e:
+                    errors[i] = str(e)
+
+        for i, command in enumerate(pending):
+            if i in errors:
+                write(_response(command, ok=False, error=errors[i]))
+            else:
+                write(_finish_lookup(command, issues_by_index[i]))
+        pending.clear()
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            command = json.loads(line)
+            command_name = command["cmd"]
+        except (ValueError, KeyError, TypeError) as e:
+            flush()
+            write(json.dumps({"ok": False, "error": f"Invalid command: {e}"}))
+            continue
+
+        if command_name in LOOKUP_COMMANDS:
+            pending.append(command)
+            if len(pending) >= BATCH_SIZE or not ready():
+                flush()
+            continue
+
+        flush()
+        if command_name == "create":
+            try:
+                write(_run_create(command))
+            except Exception as e:
+                write(_response(command, ok=False, error=str(e)))
+        else:
+            write(_response(command, ok=False, error=f"Unknown command '{command_name}'"))
+
+    flush()
@@ -0,0 +1,192 @@
+# /usr/bin/env python3
+import json
+import time
+from typing import Any
+
+from ginear.completion import write_completions
+from ginear.index import INDEX_PATH, build_index
+from ginear.utils import CACHE_DIR, atomic_write, file_lock
+
+ISSUES_PATH = CACHE_DIR / "issues.ndjson"
+META_PATH = CACHE_DIR / "meta.json"
+SYNC_LOCK_PATH = CACHE_DIR / "sync.lock"
+
+# Issues are fetched page by page, so the sync is not bound to a single page
+SYNC_ISSUE_LIMIT = 1000
+
+# Older caches are refetched before listing, so web UI changes show up without hooks
+CACHE_MAX_AGE = 300
+
+
+def read_meta() -> dict[str, Any]:
+    try:
+        meta = json.loads(META_PATH.read_text())
+    except (OSError, ValueError):
+        return {}
+    return meta if isinstance(meta, dict) else {}
+
+
+def write_meta(meta: dict[str, Any]) -> None:
+    atomic_write(META_PATH, json.dumps(meta))
+
+
+def cache_age() -> float:
+    """Seconds since the last successful sync, or infinity when never synced."""
+    synced_at = read_meta().get("synced_at")
+    if not isinstance(synced_at, (int, float)):
+        return float("inf")
+    return time.time() - synced_at
+
+
+def read_issues(team_id: str, excluded_states: list[str]) -> list[dict[str, Any]] | None:
+    """Return the cached issues, or None when the cache belongs to another setup."""
+    meta = read_meta()
+    if meta.get("team_id") != team_id or meta.get("excluded_states") != excluded_states:
+        return None
+
+    try:
+        with ISSUES_PATH.open() as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError):
+        return None
+
+
+def write_issues(
+    team_id: str,
+    excluded_states: list[str],
+    issues: list[dict[str, Any]],
+    metadata: dict[str, Any] | None = None,
+) -> None:
+    """Store issues (and optionally teams/projects/states) and regenerate completions."""
+    meta = read_meta()
+    if meta.get("team_id") != team_id:
+        # Metadata of the previous team is no longer valid
+        meta = {}
+    meta.update(metadata or {})
+    meta.update(
+        {
+            "team_id": team_id,
+            "excluded_states": excluded_states,
+            "synced_at": time.time(),
+        }
+    )
+    _write_issue_files(issues, meta)
+
+
+def _write_issue_files(issues: list[dict[str, Any]], meta: dict[str, Any]) -> None:
+    issues_data, index_data = build_index(issues)
+    # The index points into the issues file, so it is replaced after it
+    atomic_write(ISSUES_PATH, issues_data)
+    atomic_write(INDEX_PATH, index_data)
+    write_meta(meta)
+    write_completions(issues, meta)
+
+
+def add_issue(team_id: str, issue: dict[str, Any]) -> None:
+    """Put a newly created issue at the top of the cache, keeping its sync time."""
+    with file_lock(SYNC_LOCK_PATH):
+        meta = read_meta()
+        if meta.get("team_id") != team_id:
+            return
+        issues = read_issues(team_id, meta.get("excluded_states", []))
+        if issues is None:
+            return
+        _write_issue_files([issue, *issues], meta)
+
+
+def update_cached_issues(
+    team_id: str, state_id: str, issues: list[dict[str, Any]]
+) -> None:
+    """Write issues moved to `state_id` back into the cache, keeping its sync time."""
+    if not issues:
+        return
+    with file_lock(SYNC_LOCK_PATH):
+        meta = read_meta()
+        if meta.get("team_id") != team_id:
+            return
+        excluded_states = meta.get("excluded_states", [])
+        cached_issues = read_issues(team_id, excluded_states)
+        if cached_issues is None:
+            return
+        issues_by_id = {issue["id"]: issue for issue in issues}
+        if state_id in excluded_states:
+            # The cache only holds issues that are not in an excluded state
+            cached_issues = [
+                issue for issue in cached_issues if issue["id"] not in issues_by_id
+            ]
+        else:
+            cached_issues = [
+                issues_by_id.get(issue["id"], issue) for issue in cached_issues
+            ]
+        _write_issue_files(cached_issues, meta)
+
+
+def load_issues(team_id: str, excluded_states: list[str]) -> list[dict[str, Any]]:
+    """
+    Cached issues, refetching them when missing or older than CACHE_MAX_AGE.
+
+    Concurrent callers elect a single fetcher through the sync lock: the others
+    wait for it and read what it wrote instead of calling the API themselves. A
+    stale cache is only used when the refetch fails.
+    """
+    from ginear.queries import get_issues
+
+    issues = read_issues(team_id, excluded_states)
+    if issues is not None and cache_age() < CACHE_MAX_AGE:
+        return issues
+
+    with file_lock(SYNC_LOCK_PATH):
+        # Another process may have refreshed the cache while we waited for the lock
+        issues = read_issues(team_id, excluded_states)
+        if issues is not None and cache_age() < CACHE_MAX_AGE:
+            return issues
+
+        try:
+            # As many as `gin sync` keeps, since the cache is replaced with them
+            fetched_issues = get_issues(limit=SYNC_ISSUE_LIMIT)
+        except Exception:
+            if issues is None:
+                raise
+            return issues
+        write_issues(team_id, excluded_states, fetched_issues)
+    return fetched_issues
+
+
+def refresh_cache(
+    team_id: str, excluded_states: list[str], max_age: float = 0, wait: bool = False
+) -> bool:
+    """
+    Fetch issues and team metadata into the cache.
+
+    Returns False without fetching when the cache is younger than `max_age` seconds,
+    or when another process is already syncing. With `wait`, that sync is waited
+    for and its result is used rather than fetching again.
+    """
+    from ginear.queries import (
+        get_issues,
+        get_project_ids_for_team,
+        get_state_ids_for_team,
+        get_team_ids,
+    )
+
+    with file_lock(SYNC_LOCK_PATH, blocking=False) as acquired:
+        if not acquired:
+            if wait:
+                with file_lock(SYNC_LOCK_PATH):
+                    pass
+            return False
+        if cache_age() < max_age:
+            return False
+
+        issues = get_issues(limit=SYNC_ISSUE_LIMIT)
+        teams = get_team_ids()
+        projects = get_project_ids_for_team(team_id)
+        states = get_state_ids_for_team(team_id)
+
+        write_issues(
+            team_id,
+            excluded_states,
+            issues,
+            {"teams": teams, "projects": projects, "states": states},
+        )
+        return True
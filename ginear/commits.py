@@ -0,0 +1,305 @@
+# /usr/bin/env python3
+import json
+import re
+import subprocess
+from pathlib import Path
+from typing import Any
+
+from ginear.utils import atomic_write, file_lock
+
+INDEX_VERSION = 2
+
+# Identifiers as Linear writes them (ENG-123), also inside branch names
+# (hww/eng-123-...). Both are checked against the cached team keys; before the
+# first sync, branches need a user prefix so that e.g. release-2 is no issue.
+IDENTIFIER_PATTERN = re.compile(r"\b([A-Z][A-Z0-9]*-\d+)\b")
+BRANCH_IDENTIFIER_PATTERN = re.compile(r"^([A-Za-z][A-Za-z0-9]*)-(\d+)(?:-|$)")
+
+# Used when no remote HEAD points to the default branch
+DEFAULT_BRANCHES = ("refs/heads/main", "refs/heads/master")
+
+
+def _git(*args: str, input: str | None = None) -> str:
+    result = subprocess.run(
+        ["git", *args],
+        input=input,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    return result.stdout
+
+
+def get_index_path() -> Path:
+    """The index lives in the repository's git dir, shared by all worktrees."""
+    git_dir = Path(_git("rev-parse", "--git-common-dir").strip()).resolve()
+    return git_dir / "ginear" / "commits.json"
+
+
+def _team_keys() -> list[str]:
+    """Issue prefixes of the cached teams; empty before the first `gin sync`."""
+    from ginear.cache import read_meta
+
+    return sorted(
+        team["key"].upper() for team in read_meta().get("teams", []) if team.get("key")
+    )
+
+
+def _branch_name(refname: str) -> str:
+    if refname.startswith("refs/heads/"):
+        return refname[len("refs/heads/") :]
+    # refs/remotes/<remote>/<branch>
+    return refname.split("/", 3)[-1]
+
+
+def _branch_identifier(refname: str, keys: list[str]) -> str | None:
+    branch_name = _branch_name(refname)
+    match = BRANCH_IDENTIFIER_PATTERN.match(branch_name.rsplit("/", 1)[-1])
+    if match is None:
+        return None
+    key = match.group(1).upper()
+    if keys and key not in keys:
+        return None
+    if not keys and "/" not in branch_name:
+        return None
+    return f"{key}-{match.group(2)}"
+
+
+def _message_identifiers(message: str, keys: list[str]) -> list[str]:
+    identifiers = IDENTIFIER_PATTERN.findall(message)
+    if keys:
+        return [
+            identifier
+            for identifier in identifiers
+            if identifier.rsplit("-", 1)[0] in keys
+        ]
+    return identifiers
+
+
+def _merge_base(a: str, b: str) -> str | None:
+    result = subprocess.run(
+        ["git", "merge-base", a, b],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    return result.stdout.strip() or None
+
+
+def _is_ancestor(ancestor: str, descendant: str) -> bool:
+    result = subprocess.run(
+        ["git", "merge-base", "--is-ancestor", ancestor, descendant],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return result.returncode == 0
+
+
+def _default_branches(refs: dict[str, str]) -> list[str]:
+    """The default branch, followed by its local branch when it is a remote one."""
+    result = subprocess.run(
+        ["git", "symbolic-ref", "-q", "refs/remotes/origin/HEAD"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    remote_head = result.stdout.strip()
+    if remote_head in refs:
+        local_branch = f"refs/heads/{_branch_name(remote_head)}"
+        return [remote_head, *([local_branch] if local_branch in refs else [])]
+    for ref in DEFAULT_BRANCHES:
+        if ref in refs:
+            return [ref]
+    return ["HEAD"]
+
+
+def _reflog(ref: str) -> list[str]:
+    """Previous values of `ref`, newest first."""
+    result = subprocess.run(
+        ["git", "reflog", "show", "--format=%H", ref, "--"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    return result.stdout.split()
+
+
+def _fork_point(
+    ref: str, sha: str, default_branch: str, previous_default_tips: list[str]
+) -> str | None:
+    """
+    The commit `ref` was branched off the default branch from; only commits after
+    it belong to the branch. None when the two share no history.
+
+    `previous_default_tips` are earlier tips of the default branch, newest first.
+    """
+    base = _merge_base(sha, default_branch)
+    if base != sha:
+        return base
+
+    # Already merged. With a merge commit, the branch forked from its first parent.
+    merged_into = _git(
+        "rev-list", "--first-parent", "--ancestry-path", f"{sha}..{default_branch}"
+    ).split()
+    if merged_into:
+        first_parent = _git("rev-parse", f"{merged_into[-1]}^1").strip()
+        if first_parent != sha:
+            return _merge_base(first_parent, sha)
+
+    # Fast-forwarded: the history no longer shows where the branch started, but
+    # the default branch's tip from before the merge does, as does the point the
+    # branch was created at (which a rebase makes stale, so it comes last)
+    for tip in previous_default_tips:
+        if not _is_ancestor(sha, tip):
+            return _merge_base(tip, sha)
+    if ref.startswith("refs/heads/"):
+        created_at = _reflog(ref)[-1:]
+        if created_at and _is_ancestor(created_at[0], sha):
+            return created_at[0]
+    return sha
+
+
+def _existing_commits(shas: list[str]) -> list[str]:
+    """Drop commits that no longer exist, e.g. after a force push and gc."""
+    if not shas:
+        return []
+    output = _git(
+        "cat-file", "--batch-check", input="".join(f"{sha}\n" for sha in shas)
+    )
+    return [
+        line.split()[0]
+        for line in output.splitlines()
+        if not line.endswith("missing")
+    ]
+
+
+def _revisions(include: list[str], exclude: list[str]) -> str:
+    """Revisions for `--stdin`, which avoids argument limits with many refs."""
+    return "".join(
+        [*(f"{sha}\n" for sha in include), *(f"^{sha}\n" for sha in exclude)]
+    )
+
+
+def _read_index(index_path: Path, keys: list[str]) -> dict[str, Any]:
+    try:
+        index = json.loads(index_path.read_text())
+    except (OSError, ValueError):
+        index = {}
+    if (
+        not isinstance(index, dict)
+        or index.get("version") != INDEX_VERSION
+        # Identifiers are matched against the team keys, so new keys need a rescan
+        or index.get("keys") != keys
+    ):
+        return {"version": INDEX_VERSION, "keys": keys, "refs": {}, "issues": {}}
+    return index
+
+
+def update_index() -> dict[str, list[str]]:
+    """
+    Bring the issue→commits index up to date and return it.
+
+    Only commits that are new since each ref's last indexed tip are read: their
+    messages are scanned for identifiers, and the commits a branch named after an
+    issue added since it forked from the default branch are attributed to that
+    issue, also once the branch has been merged.
+    """
+    index_path = get_index_path()
+    keys = _team_keys()
+    with file_lock(index_path.with_suffix(".lock")):
+        index = _read_index(index_path, keys)
+        indexed_refs: dict[str, str] = index["refs"]
+        issues: dict[str, list[str]] = index["issues"]
+
+        refs: dict[str, str] = {}
+        for line in _git(
+            "for-each-ref",
+            "--format=%(objectname) %(refname)",
+            "refs/heads",
+            "refs/remotes",
+        ).splitlines():
+            sha, ref = line.split(" ", 1)
+            if not ref.endswith("/HEAD"):
+                refs[ref] = sha
+
+        changed = {
+            ref: sha for ref, sha in refs.items() if indexed_refs.get(ref) != sha
+        }
+        if not changed:
+            return issues
+
+        def add(identifier: str, sha: str) -> None:
+            shas = issues.setdefault(identifier, [])
+            if sha not in shas:
+                shas.append(sha)
+
+        # Everything reachable from a previously indexed tip has been seen already
+        seen = _existing_commits(sorted(set(indexed_refs.values())))
+
+        log = _git(
+            "log",
+            "--format=%H%x1f%B%x1e",
+            "--stdin",
+            input=_revisions(sorted(set(changed.values())), seen),
+        )
+        for entry in log.split("\x1e"):
+            if "\x1f" not in entry:
+                continue
+            sha, message = entry.strip().split("\x1f", 1)
+            for mentioned in _message_identifiers(message, keys):
+                add(mentioned, sha)
+
+        default_branches = _default_branches(refs)
+        default_branch = default_branches[0]
+        # Read once, they are the same for every fast-forwarded branch
+        previous_default_tips = [
+            *_existing_commits(
+                [indexed_refs[default_branch]] if default_branch in indexed_refs else []
+            ),
+            *(tip for default in default_branches for tip in _reflog(default)),
+        ]
+        for ref, sha in changed.items():
+            identifier = _branch_identifier(ref, keys)
+            if identifier is None:
+                continue
+            previous_tip = (
+                _existing_commits([indexed_refs[ref]]) if ref in indexed_refs else []
+            )
+            fork_point = _fork_point(ref, sha, default_branch, previous_default_tips)
+            branch_commits = _git(
+                "rev-list",
+                "--stdin",
+                input=_revisions(
+                    [sha], [*previous_tip, *([fork_point] if fork_point else [])]
+                ),
+            )
+            for commit in branch_commits.split():
+                add(identifier, commit)
+
+        index["refs"] = refs
+        atomic_write(index_path, json.dumps(index))
+        return issues
+
+
+def get_commits(identifier: str) -> list[dict[str, str]]:
+    """Commits linked to `identifier`, newest first."""
+    shas = _existing_commits(update_index().get(identifier.upper(), []))
+    if not shas:
+        return []
+
+    output = _git(
+        "log",
+        "--no-walk",
+        "--date=short",
+        "--format=%H%x1f%an%x1f%ad%x1f%s",
+        "--stdin",
+        input=_revisions(shas, []),
+    )
+    commits = []
+    for line in output.splitlines():
+        sha, author, date, subject = line.split("\x1f", 3)
+        commits.append(
+            {"sha": sha, "author": author, "date": date, "subject": subject}
+        )
+    return commits
@@ -0,0 +1,109 @@
+# /usr/bin/env python3
+from typing import Any
+
+from ginear.utils import CACHE_DIR, atomic_write
+
+COMPLETIONS_PATH = CACHE_DIR / "completions.tsv"
+
+# The scripts only read COMPLETIONS_PATH with awk, so pressing TAB never starts
+# Python. `gin sync` keeps the file up to date.
+BASH_SCRIPT = r"""_gin_completion() {
+    local cur=${COMP_WORDS[COMP_CWORD]} kind
+    if [ "$COMP_CWORD" -eq 1 ]; then
+        COMPREPLY=($(compgen -W "@COMMANDS@" -- "$cur"))
+        return
+    fi
+    case ${COMP_WORDS[1]} in
+        @CASES@
+        *) return ;;
+    esac
+    case $cur in -*) return ;; esac
+    local IFS=$'\n'
+    COMPREPLY=($(awk -F '\t' -v kind="$kind" -v cur="$cur" \
+        '$1 == kind && index(tolower($2), tolower(cur)) == 1 { gsub(/ /, "\\ ", $2); print $2 }' \
+        "@COMPLETIONS_PATH@" 2>/dev/null))
+}
+complete -F _gin_completion gin
+"""
+
+ZSH_SCRIPT = r"""#compdef gin
+_gin() {
+    local -a commands entries
+    local kind
+    if (( CURRENT == 2 )); then
+        commands=(@COMMANDS@)
+        _describe 'command' commands
+        return
+    fi
+    case $words[2] in
+        @CASES@
+        *) return 1 ;;
+    esac
+    entries=(${(f)"$(awk -F '\t' -v kind="$kind" \
+        '$1 == kind { gsub(/:/, "\\:", $2); print $2 ":" $3 }' \
+        "@COMPLETIONS_PATH@" 2>/dev/null)"})
+    _describe "$kind" entries
+}
+if [[ "$funcstack[1]" = "_gin" ]]; then
+    _gin "$@"
+else
+    compdef _gin gin
+fi
+"""
+
+FISH_SCRIPT = r"""function __gin_completion_entries
+    awk -F '\t' -v kind=$argv[1] '$1 == kind { print $2 "\t" $3 }' "@COMPLETIONS_PATH@" 2>/dev/null
+end
+complete -c gin -f
+complete -c gin -n __fish_use_subcommand -a "@COMMANDS@"
+@CASES@
+"""
+
+SHELL_SCRIPTS = {"bash": BASH_SCRIPT, "zsh": ZSH_SCRIPT, "fish": FISH_SCRIPT}
+
+# Positional arguments that are completed from COMPLETIONS_PATH
+COMPLETED_COMMANDS = {
+    "attach": "issue",
+    "log": "issue",
+    "team": "team",
+    "project": "project",
+}
+
+
+def _sanitize(value: Any) -> str:
+    return " ".join(str(value or "").split())
+
+
+def write_completions(
+    issues: list[dict[str, Any]], meta: dict[str, Any]
+) -> None:
+    """Write `kind<TAB>value<TAB>description` lines for the shell completion scripts."""
+    lines = [
+        f"issue\t{_sanitize(issue['identifier'])}\t{_sanitize(issue['title'])}"
+        for issue in issues
+    ]
+    for kind, key in (("team", "teams"), ("project", "projects")):
+        lines.extend(f"{kind}\t{_sanitize(item['name'])}\t" for item in meta.get(key, []))
+
+    atomic_write(COMPLETIONS_PATH, "".join(f"{line}\n" for line in lines))
+
+
+def get_completion_script(shell: str, commands: list[str]) -> str:
+    if shell == "fish":
+        cases = "\n".join(
+            f"complete -c gin -n '__fish_seen_subcommand_from {command}' "
+            f"-a '(__gin_completion_entries {kind})'"
+            for command, kind in COMPLETED_COMMANDS.items()
+        )
+    else:
+        cases = "\n        ".join(
+            f"{command}) kind={kind} ;;"
+            for command, kind in COMPLETED_COMMANDS.items()
+        )
+
+    return (
+        SHELL_SCRIPTS[shell]
+        .replace("@COMMANDS@", " ".join(commands))
+        .replace("@CASES@", cases)
+        .replace("@COMPLETIONS_PATH@", str(COMPLETIONS_PATH))
+    )
@@ -7,19 +7,28 @@ from typing import Annotated, Any
 import typer
 from dotenv import load_dotenv
 
+from ginear.cache import load_issues, refresh_cache
+from ginear.completion import SHELL_SCRIPTS, get_completion_script
+from ginear.hooks import install_hooks, uninstall_hooks
 from ginear.queries import (
+    EXCLUDED_STATES,
     create_issue,
+    get_issue_by_branch_name,
     get_issue_by_identifier,
     get_issues,
+    get_issues_by_branch_names,
     get_project_ids_for_team,
     get_state_ids_for_team,
     get_team_ids,
     get_user_id,
+    update_issues_state,
 )
 from ginear.utils import (
     DOTFILE_PATH,
     append_or_remove_env_list,
     clear_env_key,
+    get_current_branch,
+    get_merged_branches,
     git_commit,
     switch_branch,
     write_to_env,
@@ -27,6 +36,8 @@ from ginear.utils import (
 
 load_dotenv(dotenv_path=DOTFILE_PATH)
 app = typer.Typer()
+hooks_app = typer.Typer(help="Manage git hooks that prewarm the issue cache")
+app.add_typer(hooks_app, name="hooks")
 
 LINEAR_API_TOKEN = os.environ.get("LINEAR_API_TOKEN")
 
@@ -52,12 +63,20 @@ def get_fzf_strings(issues: list[dict[str, Any]]) -> list[str]:
     ]
 
 
+def get_prompt_issues(search_query: str | None = None) -> list[dict[str, Any]]:
+    """Unfiltered listings are served from the cache written by `gin sync`."""
+    if search_query is not None or not TEAM_ID:
+        return get_issues(search_query)
+
+    return load_issues(TEAM_ID, EXCLUDED_STATES)
+
+
 def attach_issue_prompt(
     *, search_query: str | None = None, project: bool = False
 ) -> None:
     from pyfzf.pyfzf import FzfPrompt
 
-    issues = get_issues(search_query)
+    issues = get_prompt_issues(search_query)
     fzf = FzfPrompt()
     selected_list = fzf.prompt(
         [
@@ -87,10 +106,23 @@ def attach_issue_prompt(
         print("Selected:", selected)
 
 
-def set_team() -> str:
+def find_id_by_name(items: list[dict[str, Any]], name: str) -> str:
+    for item in items:
+        if item["name"].lower() == name.lower():
+            return str(item["id"])
+    print(f"'{name}' not found")
+    raise typer.Exit(code=1)
+
+
+def set_team(name: str | None = None) -> str:
     from pyfzf.pyfzf import FzfPrompt
 
     team_ids = get_team_ids()
+    if name:
+        team_id = find_id_by_name(team_ids, name)
+        write_to_env("TEAM_ID", team_id)
+        return team_id
+
     fzf = FzfPrompt()
     selected_list = fzf.prompt(
         [
@@ -111,10 +143,13 @@ def set_team() -> str:
     return team_id
 
 
-def get_project(team_id: str) -> str | None:
+def get_project(team_id: str, name: str | None = None) -> str | None:
     from pyfzf.pyfzf import FzfPrompt
 
     project_ids = get_project_ids_for_team(team_id)
+    if name:
+        return find_id_by_name(project_ids, name)
+
     fzf = FzfPrompt()
     selected_list = fzf.prompt(
         [
@@ -159,6 +194,24 @@ def set_state(team_id: str) -> None:
     write_to_env("INITIAL_STATE_ID", initial_issue_state)
 
 
+def select_state(state_ids: list[dict[str, Any]], header: str) -> str:
+    from pyfzf.pyfzf import FzfPrompt
+
+    fzf = FzfPrompt()
+    selected_list = fzf.prompt(
+        [f"[{state['name']}] – {state['id']}" for state in state_ids],
+        fzf_options=f"--header '{header}'",
+    )
+    if not selected_list:
+        print("Missing states")
+        raise typer.Exit()
+    state_id = selected_list[0].split(" – ")[1]
+    if not state_id:
+        print("No state selected")
+        raise typer.Exit()
+    return str(state_id)
+
+
 def append_or_remove_to_exclude_state(team_id: str) -> None:
     from pyfzf.pyfzf import FzfPrompt
 
@@ -225,20 +278,30 @@ def run_onboarding(force: bool = False) -> None:
 
 
 @app.command()
-def project() -> None:
+def project(
+    name: Annotated[
+        str | None,
+        typer.Argument(help="Project name (skips the prompt when set)"),
+    ] = None,
+) -> None:
     """Set project_id"""
     if not TEAM_ID:
         print("Missing team_id")
         raise typer.Exit()
 
-    project_id = get_project(TEAM_ID)
+    project_id = get_project(TEAM_ID, name=name)
     write_to_env("PROJECT_ID", project_id)
 
 
 @app.command()
-def team() -> None:
+def team(
+    name: Annotated[
+        str | None,
+        typer.Argument(help="Team name (skips the prompt when set)"),
+    ] = None,
+) -> None:
     """Set team_id"""
-    set_team()
+    set_team(name=name)
 
 
 @app.command()
@@ -414,6 +477,68 @@ def attach(
         )
 
 
+@app.command()
+def current(
+    json: Annotated[
+        bool,
+        typer.Option("--json", help="Print the issue as JSON"),
+    ] = False,
+) -> None:
+    """
+    Show the Linear issue of the current branch.
+    """
+    branch_name = get_current_branch()
+    if not branch_name:
+        print("Not on a branch.")
+        raise typer.Exit(code=1)
+
+    issue = get_issue_by_branch_name(branch_name)
+    if issue is None:
+        print(f"No issue found for branch '{branch_name}'.")
+        raise typer.Exit(code=1)
+
+    if json:
+        typer.echo(json_module.dumps(issue))
+    else:
+        print(f"{issue['identifier']} – {issue['title']} – {issue['url']}")
+
+
+@app.command()
+def log(
+    identifier: Annotated[
+        str,
+        typer.Argument(help="Issue identifier, e.g. ENG-123"),
+    ],
+    json: Annotated[
+        bool,
+        typer.Option("--json", help="Print the commits as JSON"),
+    ] = False,
+) -> None:
+    """
+    List the commits of an issue, from its branches and commit messages.
+    """
+    import subprocess
+
+    from ginear.commits import get_commits
+
+    try:
+        commits = get_commits(identifier)
+    except subprocess.CalledProcessError as e:
+        # e.g. "fatal: not a git repository (or any of the parent directories): .git"
+        message = (e.stderr or "").strip()
+        print(message.splitlines()[0] if message else str(e))
+        raise typer.Exit(code=1)
+
+    if json:
+        typer.echo(json_module.dumps(commits))
+        return
+
+    for commit in commits:
+        typer.echo(
+            f"{commit['sha'][:10]}\t{commit['date']}\t{commit['author']}\t{commit['subject']}"
+        )
+
+
 @app.command()
 def search(
     query: Annotated[
@@ -449,6 +574,183 @@ def search(
         )
 
 
+@app.command()
+def batch() -> None:
+    """
+    Run NDJSON commands from stdin (search, show, attach, create) in one process.
+
+    Each line is an object such as {"cmd": "search", "query": "login", "limit": 10},
+    {"cmd": "show", "identifier": "ENG-123"}, {"cmd": "attach", "identifier":
+    "ENG-123", "no_switch": true} or {"cmd": "create", "title": "..."}. One NDJSON
+    response is written per command, in order, echoing an optional "id".
+    """
+    import sys
+
+    from ginear.batch import StdinLines, run_batch
+
+    if not TEAM_ID:
+        print("Missing team_id. Run `gin init`.")
+        raise typer.Exit(code=1)
+
+    lines = StdinLines(sys.stdin.fileno())
+    run_batch(lines, lambda line: typer.echo(line), ready=lines.ready)
+
+
+@app.command()
+def prune(
+    base: Annotated[
+        str,
+        typer.Option("--base", "-b", help="Branch the issue branches were merged into"),
+    ] = "HEAD",
+    state_name: Annotated[
+        str | None,
+        typer.Option("--state", "-s", help="State to move issues to (prompts if unset)"),
+    ] = None,
+    dry_run: Annotated[
+        bool,
+        typer.Option("--dry-run", help="Only list the issues that would be moved"),
+    ] = False,
+    json: Annotated[
+        bool,
+        typer.Option("--json", help="Print the affected issues as JSON"),
+    ] = False,
+) -> None:
+    """
+    Move the issues of all local branches merged into --base to another state.
+    """
+    import subprocess
+
+    if not TEAM_ID:
+        print("Missing team_id. Run `gin init`.")
+        raise typer.Exit(code=1)
+
+    try:
+        merged_branches = get_merged_branches(base)
+    except subprocess.CalledProcessError as e:
+        # e.g. "fatal: malformed object name nosuchbranch"
+        message = (e.stderr or "").strip()
+        print(message.splitlines()[0] if message else str(e))
+        raise typer.Exit(code=1)
+
+    state_ids = get_state_ids_for_team(TEAM_ID)
+    if state_name:
+        state_id = find_id_by_name(state_ids, state_name)
+    else:
+        state_id = select_state(
+            state_ids, "Select the state you want merged issues to be moved to"
+        )
+    target_state = next(state for state in state_ids if state["id"] == state_id)
+
+    issues = []
+    skipped = []
+    for issue in get_issues_by_branch_names(merged_branches):
+        if (issue.get("team") or {}).get("id") != TEAM_ID:
+            # state_id belongs to TEAM_ID, so it cannot be set on other teams' issues
+            skipped.append(issue)
+        elif issue["state"]["name"] != target_state["name"]:
+            issues.append(issue)
+
+    failed = []
+    if not dry_run and issues:
+        issues_by_id = {issue["id"]: issue for issue in issues}
+        issues, failures = update_issues_state(list(issues_by_id), state_id)
+        failed = [
+            {**issues_by_id[failure["id"]], "error": failure["error"]}
+            for failure in failures
+        ]
+
+    if json:
+        typer.echo(
+            json_module.dumps({"issues": issues, "skipped": skipped, "failed": failed})
+        )
+    else:
+        for issue in issues:
+            typer.echo(
+                f"{issue['identifier']}\t[{issue['state']['name']}]\t{issue['title']}\t{issue['branchName']}"
+            )
+        for issue in skipped:
+            print(f"Skipped {issue['identifier']}: belongs to another team")
+        for issue in failed:
+            print(f"Failed {issue['identifier']}: {issue['error']}")
+        if dry_run:
+            print(f"🍸 {len(issues)} issues would be moved to {target_state['name']}")
+        else:
+            print(f"🍸 {len(issues)} issues moved to {target_state['name']}")
+
+    if failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def sync(
+    max_age: Annotated[
+        int,
+        typer.Option("--max-age", help="Skip if the cache is younger than N seconds"),
+    ] = 0,
+    quiet: Annotated[
+        bool,
+        typer.Option("--quiet", "-q", help="Do not print anything"),
+    ] = False,
+) -> None:
+    """
+    Refresh the local cache of issues, teams, projects and states.
+    """
+    if not LINEAR_API_TOKEN or not TEAM_ID:
+        if not quiet:
+            print("Missing team_id. Run `gin init`.")
+        raise typer.Exit(code=1)
+
+    refreshed = refresh_cache(TEAM_ID, EXCLUDED_STATES, max_age=max_age, wait=True)
+    if not quiet:
+        print("🍸 Cache refreshed" if refreshed else "🍸 Cache is already fresh")
+
+
+@app.command()
+def completion(
+    shell: Annotated[
+        str,
+        typer.Argument(help="bash, zsh or fish"),
+    ],
+) -> None:
+    """
+    Print a shell completion script backed by the cache written by `gin sync`.
+    """
+    if shell not in SHELL_SCRIPTS:
+        print(f"Unsupported shell '{shell}'. Use one of: {', '.join(SHELL_SCRIPTS)}")
+        raise typer.Exit(code=1)
+
+    commands = [
+        command.name or command.callback.__name__.replace("_", "-")
+        for command in app.registered_commands
+        if command.callback
+    ] + [group.name for group in app.registered_groups if group.name]
+    typer.echo(get_completion_script(shell, commands), nl=False)
+
+
+@hooks_app.command("install")
+def hooks_install() -> None:
+    """
+    Install post-checkout, post-merge and post-rewrite hooks that refresh the
+    cache in the background.
+    """
+    installed, skipped = install_hooks()
+    for hook_path in installed:
+        print(f"🍸 Installed {hook_path}")
+    for hook_path in skipped:
+        print(f"Skipped {hook_path}: not a shell script")
+    if skipped:
+        raise typer.Exit(code=1)
+
+
+@hooks_app.command("uninstall")
+def hooks_uninstall() -> None:
+    """
+    Remove the ginear hooks, keeping any other hook content.
+    """
+    for hook_path in uninstall_hooks():
+        print(f"🍸 Removed ginear from {hook_path}")
+
+
 @app.callback(invoke_without_command=True)
 def main(
     ctx: typer.Context,
@@ -0,0 +1,102 @@
+# /usr/bin/env python3
+import subprocess
+from pathlib import Path
+
+# git has no post-fetch hook; `git pull` ends in either post-merge or post-rewrite
+HOOK_NAMES = ("post-checkout", "post-merge", "post-rewrite")
+
+# Interpreters that can run HOOK_BLOCK
+SHELLS = ("sh", "bash", "dash", "zsh", "ksh")
+
+HOOK_BEGIN = "# >>> ginear >>>"
+HOOK_END = "# <<< ginear <<<"
+
+# Only shell builtins run in the foreground: `gin sync` is forked off, detached
+# from git, and does not fetch again if another sync is already running.
+HOOK_BLOCK = f"""{HOOK_BEGIN}
+if command -v gin >/dev/null 2>&1; then
+    (nohup gin sync --max-age 60 --quiet >/dev/null 2>&1 &)
+fi
+{HOOK_END}
+"""
+
+
+def get_hooks_dir() -> Path:
+    """Hooks directory of the current repository (respects core.hooksPath)."""
+    result = subprocess.run(
+        ["git", "rev-parse", "--git-path", "hooks"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    return Path(result.stdout.strip()).resolve()
+
+
+def _strip_block(content: str) -> str:
+    start = content.find(HOOK_BEGIN)
+    end = content.find(HOOK_END)
+    if start == -1 or end == -1:
+        return content
+    return content[:start] + content[end + len(HOOK_END) :].lstrip("\n")
+
+
+def _is_shell_script(content: str) -> bool:
+    """Whether git runs the hook with a POSIX shell (no shebang means `sh`)."""
+    if not content.startswith("#!"):
+        return True
+    interpreter = content[2:].split("\n", 1)[0].split()
+    if interpreter and Path(interpreter[0]).name == "env":
+        interpreter = interpreter[1:]
+    return bool(interpreter) and Path(interpreter[0]).name in SHELLS
+
+
+def install_hooks() -> tuple[list[Path], list[Path]]:
+    """
+    Add the prewarm block to each hook, keeping any existing hook content.
+
+    The block goes right after the shebang, since existing hooks often end in
+    `exit` or `exec`. Hooks in other languages are left alone and returned as
+    skipped.
+    """
+    hooks_dir = get_hooks_dir()
+    hooks_dir.mkdir(parents=True, exist_ok=True)
+
+    installed = []
+    skipped = []
+    for hook_name in HOOK_NAMES:
+        hook_path = hooks_dir / hook_name
+        content = hook_path.read_text() if hook_path.exists() else "#!/bin/sh\n"
+        if not _is_shell_script(content):
+            skipped.append(hook_path)
+            continue
+        content = _strip_block(content)
+        shebang = ""
+        if content.startswith("#!"):
+            shebang, _, content = content.partition("\n")
+            shebang += "\n"
+        hook_path.write_text(shebang + HOOK_BLOCK + content)
+        hook_path.chmod(hook_path.stat().st_mode | 0o111)
+        installed.append(hook_path)
+    return installed, skipped
+
+
+def uninstall_hooks() -> list[Path]:
+    """Remove the prewarm block, deleting hooks that contained nothing else."""
+    hooks_dir = get_hooks_dir()
+
+    removed = []
+    for hook_name in HOOK_NAMES:
+        hook_path = hooks_dir / hook_name
+        if not hook_path.exists():
+            continue
+        original = hook_path.read_text()
+        content = _strip_block(original)
+        if content == original:
+            continue
+        if content.strip() in ("", "#!/bin/sh"):
+            hook_path.unlink()
+        else:
+            hook_path.write_text(content)
+        removed.append(hook_path)
+    return removed
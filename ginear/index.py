@@ -0,0 +1,121 @@
+# /usr/bin/env python3
+"""
+On-disk index over the cached issues, so one issue can be found without parsing
+the whole cache.
+
+Layout of issues.idx (little endian):
+
+    header      magic, version, identifier count, branch count
+    tables      identifier table, then branch table, sorted by key. Each entry is
+                (key offset, key length, line offset, line length), where the key
+                lives in the key blob and the line in issues.ndjson
+    key blob    the UTF-8 encoded keys
+
+Lookups mmap the file and binary search a table, touching only a few pages.
+"""
+import json
+import mmap
+import struct
+from typing import Any
+
+from ginear.utils import CACHE_DIR
+
+INDEX_PATH = CACHE_DIR / "issues.idx"
+
+MAGIC = b"GIDX"
+VERSION = 1
+HEADER = struct.Struct("<4sIII")
+ENTRY = struct.Struct("<IIII")
+
+
+def build_index(issues: list[dict[str, Any]]) -> tuple[bytes, bytes]:
+    """Return the NDJSON cache contents and the matching index."""
+    lines = []
+    identifier_keys = []
+    branch_keys = []
+    offset = 0
+    for issue in issues:
+        line = f"{json.dumps(issue)}\n".encode()
+        location = (offset, len(line))
+        identifier_keys.append((issue["identifier"].upper().encode(), location))
+        if issue.get("branchName"):
+            branch_keys.append((issue["branchName"].encode(), location))
+        lines.append(line)
+        offset += len(line)
+
+    identifier_keys.sort()
+    branch_keys.sort()
+
+    entries = []
+    blob = bytearray()
+    blob_offset = HEADER.size + ENTRY.size * (len(identifier_keys) + len(branch_keys))
+    for key, (line_offset, line_length) in [*identifier_keys, *branch_keys]:
+        entries.append(
+            ENTRY.pack(blob_offset + len(blob), len(key), line_offset, line_length)
+        )
+        blob.extend(key)
+
+    header = HEADER.pack(MAGIC, VERSION, len(identifier_keys), len(branch_keys))
+    return b"".join(lines), header + b"".join(entries) + bytes(blob)
+
+
+def _find(table: int, key: str) -> tuple[int, int] | None:
+    """Binary search `table` (0: identifiers, 1: branches) for the line location."""
+    key_bytes = key.encode()
+    try:
+        with INDEX_PATH.open("rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as index:
+            magic, version, identifier_count, branch_count = HEADER.unpack_from(index)
+            if magic != MAGIC or version != VERSION:
+                return None
+
+            low, high = (0, identifier_count) if table == 0 else (0, branch_count)
+            table_offset = HEADER.size + (0 if table == 0 else identifier_count) * ENTRY.size
+            while low < high:
+                middle = (low + high) // 2
+                key_offset, key_length, line_offset, line_length = ENTRY.unpack_from(
+                    index, table_offset + middle * ENTRY.size
+                )
+                candidate = index[key_offset : key_offset + key_length]
+                if candidate == key_bytes:
+                    return line_offset, line_length
+                if candidate < key_bytes:
+                    low = middle + 1
+                else:
+                    high = middle
+    except (OSError, ValueError, struct.error):
+        return None
+    return None
+
+
+def _read_issue(location: tuple[int, int] | None) -> dict[str, Any] | None:
+    from ginear.cache import ISSUES_PATH
+
+    if location is None:
+        return None
+    line_offset, line_length = location
+    try:
+        with ISSUES_PATH.open("rb") as f:
+            f.seek(line_offset)
+            issue = json.loads(f.read(line_length))
+    except (OSError, ValueError):
+        return None
+    return issue if isinstance(issue, dict) else None
+
+
+def lookup_identifier(identifier: str) -> dict[str, Any] | None:
+    """The cached issue for an identifier like 'ENG-123', or None."""
+    issue = _read_issue(_find(0, identifier.upper()))
+    # The cache may have been rewritten since the index was read
+    if issue is None or issue.get("identifier", "").upper() != identifier.upper():
+        return None
+    return issue
+
+
+def lookup_branch(branch_name: str) -> dict[str, Any] | None:
+    """The cached issue whose branchName is `branch_name`, or None."""
+    issue = _read_issue(_find(1, branch_name))
+    if issue is None or issue.get("branchName") != branch_name:
+        return None
+    return issue
@@ -0,0 +1,79 @@
+# /usr/bin/env python3
+import json
+import time
+from typing import Any
+
+from ginear.utils import CACHE_DIR, atomic_write
+
+PAGE_SIZES_PATH = CACHE_DIR / "page_sizes.json"
+
+# Linear caps `first` at 250 and rejects single queries above 10,000 complexity
+# points. Pages are sized to stay comfortably below that.
+MAX_PAGE_SIZE = 250
+MIN_PAGE_SIZE = 10
+COMPLEXITY_LIMIT = 10_000
+COMPLEXITY_TARGET = int(COMPLEXITY_LIMIT * 0.8)
+
+_page_sizes: dict[str, dict[str, Any]] | None = None
+
+
+class QueryTooComplexError(Exception):
+    pass
+
+
+def _load() -> dict[str, dict[str, Any]]:
+    global _page_sizes
+    if _page_sizes is None:
+        try:
+            _page_sizes = json.loads(PAGE_SIZES_PATH.read_text())
+        except (OSError, ValueError):
+            _page_sizes = {}
+    return _page_sizes
+
+
+def _clamp(page_size: int) -> int:
+    return max(MIN_PAGE_SIZE, min(MAX_PAGE_SIZE, page_size))
+
+
+def get_query_stats(query_name: str) -> dict[str, Any]:
+    """What was learned about `query_name`: page_size, cost_per_item, recorded_at."""
+    return dict(_load().get(query_name, {}))
+
+
+def get_page_size(query_name: str) -> int:
+    """The learned page size for `query_name`, starting optimistic at the maximum."""
+    return int(_load().get(query_name, {}).get("page_size", MAX_PAGE_SIZE))
+
+
+def record_complexity(query_name: str, page_size: int, complexity: int) -> None:
+    """
+    Learn the page size that keeps `query_name` just under COMPLEXITY_TARGET.
+
+    Linear's complexity grows linearly with `first`, so the cost of one page tells
+    us the cost per item. The largest page under the target gives the most items
+    per second, since each round trip dominates the time spent per page.
+    """
+    if page_size <= 0 or complexity <= 0:
+        return
+
+    cost_per_item = complexity / page_size
+    page_sizes = _load()
+    page_sizes[query_name] = {
+        "page_size": _clamp(int(COMPLEXITY_TARGET / cost_per_item)),
+        "cost_per_item": cost_per_item,
+        "recorded_at": time.time(),
+    }
+    atomic_write(PAGE_SIZES_PATH, json.dumps(page_sizes))
+
+
+def record_too_complex(query_name: str, page_size: int) -> int:
+    """Halve the page size after Linear rejected the query. Returns the new size."""
+    new_page_size = _clamp(page_size // 2)
+    page_sizes = _load()
+    page_sizes[query_name] = {
+        **page_sizes.get(query_name, {}),
+        "page_size": new_page_size,
+        "recorded_at": time.time(),
+    }
+    atomic_write(PAGE_SIZES_PATH, json.dumps(page_sizes))
+    return new_page_size
@@ -1,13 +1,31 @@
 # /usr/bin/env python3
+import copy
 import json
 import os
+import re
+import sys
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
 from typing import Any, cast
 
 import requests
 import typer
 from dotenv import load_dotenv
+from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn
 
+from ginear.cache import add_issue, update_cached_issues
+from ginear.index import lookup_branch, lookup_identifier
+from ginear.paging import (
+    MIN_PAGE_SIZE,
+    QueryTooComplexError,
+    get_page_size,
+    get_query_stats,
+    record_complexity,
+    record_too_complex,
+)
 from ginear.utils import DOTFILE_PATH, clear_env_key, switch_branch
 
 load_dotenv(dotenv_path=DOTFILE_PATH)
@@ -17,13 +35,65 @@ TEAM_ID = os.environ.get("TEAM_ID")
 PROJECT_ID = os.environ.get("PROJECT_ID")
 USER_ID = os.environ.get("USER_ID")
 INITIAL_STATE_ID = os.environ.get("INITIAL_STATE_ID")
-EXCLUDED_STATES = os.environ.get("EXCLUDED_STATES", "")
-EXCLUDED_STATES = EXCLUDED_STATES.split(",") if EXCLUDED_STATES else []
+EXCLUDED_STATES = [
+    state for state in os.environ.get("EXCLUDED_STATES", "").split(",") if state
+]
 
 ADD_DESCRIPTION_TEXT = (
     True if os.environ.get("ADD_DESCRIPTION_TEXT", default="True") == "True" else False
 )
 
+ISSUE_FIELDS = """
+    id
+    identifier
+    title
+    branchName
+    url
+    creator {
+        name
+    }
+    state {
+        name
+    }
+"""
+
+# Without the nested creator, an issue costs less complexity, so more fit per page
+LEAN_ISSUE_FIELDS = """
+    id
+    identifier
+    title
+    branchName
+    url
+    state {
+        name
+    }
+"""
+
+# Switch to LEAN_ISSUE_FIELDS when full issues no longer fit this many per page
+LEAN_ISSUES_PAGE_SIZE = 50
+
+# Full fields are measured again after this many seconds, so a lean choice made
+# while issues were expensive does not stick once their cost drops
+FULL_ISSUE_FIELDS_RETRY = 24 * 60 * 60
+
+# Number of aliased queries/mutations combined into a single request
+BATCH_SIZE = 50
+
+API_ENDPOINT = "https://api.linear.app/graphql"
+
+# One keep-alive connection shared by every request of the process
+session = requests.Session()
+
+# Results of queries already made by this process, keyed by normalized query and
+# variables. Callers asking while a query is in flight wait for the same future.
+_memo: dict[str, Future[tuple[dict[str, Any], int | None]]] = {}
+_memo_lock = threading.Lock()
+
+# The entity a mutation writes, e.g. "issue" for issueCreate and issueUpdate
+MUTATED_ENTITY_PATTERN = re.compile(
+    r"\b([a-z]\w*?)(?:Create|Update|Delete|Archive)\s*\("
+)
+
 
 def get_user_id() -> dict[str, Any]:
     query = """
@@ -50,33 +120,39 @@ def get_user_id() -> dict[str, Any]:
 
 def get_team_ids() -> list[dict[str, Any]]:
     query = """
-    query {
-        teams(first: 250) {
+    query ($first: Int!, $after: String) {
+        teams(first: $first, after: $after) {
             nodes {
                 id
                 name
+                key
+            }
+            pageInfo {
+                hasNextPage
+                endCursor
             }
         }
     }
     """
 
-    request_data = {"query": query}
-
-    result = call_linear_api(request_data)
-    return cast(list[dict[str, Any]], result["teams"]["nodes"])
+    return fetch_pages("teams", query, {}, lambda result: result["teams"])
 
 
 def get_project_ids_for_team(team_id: str) -> list[dict[str, Any]]:
     query = """
-    query GetProjectsInTeam($teamId: String!) {
+    query GetProjectsInTeam($teamId: String!, $first: Int!, $after: String) {
         team(id: $teamId) {
             id
             name
-            projects(first:250) {
+            projects(first: $first, after: $after) {
                 nodes {
                     id
                     name
                 }
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
             }
         }
     }
@@ -86,10 +162,9 @@ def get_project_ids_for_team(team_id: str) -> list[dict[str, Any]]:
         "teamId": team_id,
     }
 
-    request_data = {"query": query, "variables": variables}
-
-    result = call_linear_api(request_data)
-    return cast(list[dict[str, Any]], result["team"]["projects"]["nodes"])
+    return fetch_pages(
+        "projects", query, variables, lambda result: result["team"]["projects"]
+    )
 
 
 def get_state_ids_for_team(team_id: str) -> list[dict[str, Any]]:
@@ -118,26 +193,35 @@ def get_state_ids_for_team(team_id: str) -> list[dict[str, Any]]:
     return cast(list[dict[str, Any]], result["team"]["states"]["nodes"])
 
 
+def use_lean_issue_fields() -> bool:
+    """Whether dropping the nested creator is worth it, from what both variants cost."""
+    full = get_query_stats("issues")
+    if "page_size" not in full:
+        return False
+    if time.time() - full.get("recorded_at", 0) > FULL_ISSUE_FIELDS_RETRY:
+        return False
+    if full["page_size"] >= LEAN_ISSUES_PAGE_SIZE:
+        return False
+
+    full_cost = full.get("cost_per_item")
+    lean_cost = get_query_stats("issues:lean").get("cost_per_item")
+    return full_cost is None or lean_cost is None or lean_cost < full_cost
+
+
 def get_issues(
     search_query: str | None = None, limit: int = 250
 ) -> list[dict[str, Any]]:
-    query = """
-    query ($teamId: String!, $filter: IssueFilter, $first: Int!) {
+    lean = use_lean_issue_fields()
+    query = (
+        """
+    query ($teamId: String!, $filter: IssueFilter, $first: Int!, $after: String) {
         team (id: $teamId) {
-            issues(first:$first, filter:$filter) {
+            issues(first:$first, after:$after, filter:$filter) {
                 edges {
                     node {
-                        id
-                        identifier
-                        title
-                        branchName
-                        url
-                        creator {
-                            name
-                        }
-                        state {
-                            name
-                        }
+                        """
+        + (LEAN_ISSUE_FIELDS if lean else ISSUE_FIELDS)
+        + """
                     }
                 }
                 pageInfo {
@@ -148,23 +232,30 @@ def get_issues(
         }
     }
     """
+    )
 
     variables: dict[str, Any] = {
         "teamId": TEAM_ID,
-        "first": limit,
-        "filter": {
-            "title": {"containsIgnoreCase": search_query},
-            "state": {"id": {"nin": EXCLUDED_STATES}},
-        },
+        "filter": search_filter(search_query),
     }
 
-    request_data = {"query": query, "variables": variables}
-    result = call_linear_api(request_data)
-
-    return [edge["node"] for edge in result["team"]["issues"]["edges"]]
+    issues = fetch_pages(
+        "issues:lean" if lean else "issues",
+        query,
+        variables,
+        lambda result: result["team"]["issues"],
+        limit=limit,
+    )
+    for issue in issues:
+        issue.setdefault("creator", None)
+    return issues
 
 
 def get_issue_by_identifier(identifier: str) -> dict[str, Any] | None:
+    cached_issue = lookup_identifier(identifier)
+    if cached_issue is not None:
+        return cached_issue
+
     query = """
     query ($teamId: String!, $filter: IssueFilter) {
         team (id: $teamId) {
@@ -186,7 +277,7 @@ def get_issue_by_identifier(identifier: str) -> dict[str, Any] | None:
 
     variables: dict[str, Any] = {
         "teamId": TEAM_ID,
-        "filter": {"number": {"eq": _identifier_to_number(identifier)}},
+        "filter": identifier_filter(identifier),
     }
 
     request_data = {"query": query, "variables": variables}
@@ -195,6 +286,155 @@ def get_issue_by_identifier(identifier: str) -> dict[str, Any] | None:
     return edges[0]["node"] if edges else None
 
 
+def search_filter(search_query: str | None) -> dict[str, Any]:
+    return {
+        "title": {"containsIgnoreCase": search_query},
+        "state": {"id": {"nin": EXCLUDED_STATES}},
+    }
+
+
+def identifier_filter(identifier: str) -> dict[str, Any]:
+    return {"number": {"eq": _identifier_to_number(identifier)}}
+
+
+def get_issues_batch(
+    lookups: list[tuple[dict[str, Any], int]],
+) -> list[list[dict[str, Any]]]:
+    """
+    Run many `(filter, first)` issue lookups as aliased fields of combined requests.
+
+    Lookups are grouped so each request asks for no more issues than the learned
+    page size of `get_issues`, keeping it below Linear's complexity limit.
+    """
+    chunks: list[list[tuple[dict[str, Any], int]]] = [[]]
+    for lookup in lookups:
+        chunk_size = sum(first for _filter, first in chunks[-1])
+        if chunks[-1] and (
+            len(chunks[-1]) >= BATCH_SIZE
+            or chunk_size + lookup[1] > get_page_size("issues")
+        ):
+            chunks.append([])
+        chunks[-1].append(lookup)
+
+    results: list[list[dict[str, Any]]] = []
+    for chunk in chunks:
+        if not chunk:
+            continue
+        variable_definitions = ", ".join(
+            [
+                "$teamId: String!",
+                *(f"$filter{i}: IssueFilter, $first{i}: Int!" for i in range(len(chunk))),
+            ]
+        )
+        selections = "\n".join(
+            f"lookup{i}: team(id: $teamId) {{ issues(first: $first{i}, filter: $filter{i}) "
+            f"{{ nodes {{ {ISSUE_FIELDS} }} }} }}"
+            for i in range(len(chunk))
+        )
+        query = f"query ({variable_definitions}) {{ {selections} }}"
+        variables: dict[str, Any] = {"teamId": TEAM_ID}
+        for i, (issue_filter, first) in enumerate(chunk):
+            variables[f"filter{i}"] = issue_filter
+            variables[f"first{i}"] = first
+
+        result = call_linear_api({"query": query, "variables": variables})
+        results.extend(
+            result[f"lookup{i}"]["issues"]["nodes"] for i in range(len(chunk))
+        )
+    return results
+
+
+def get_issues_by_branch_names(branch_names: list[str]) -> list[dict[str, Any]]:
+    """Look up the issues for many branches with aliased queries, BATCH_SIZE per request."""
+    issues: list[dict[str, Any]] = []
+    for start in range(0, len(branch_names), BATCH_SIZE):
+        chunk = branch_names[start : start + BATCH_SIZE]
+        variable_definitions = ", ".join(
+            f"$branch{i}: String!" for i in range(len(chunk))
+        )
+        selections = "\n".join(
+            f"branch{i}: issueVcsBranchSearch(branchName: $branch{i}) "
+            f"{{ {ISSUE_FIELDS} team {{ id }} }}"
+            for i in range(len(chunk))
+        )
+        query = f"query ({variable_definitions}) {{ {selections} }}"
+        variables = {f"branch{i}": branch_name for i, branch_name in enumerate(chunk)}
+
+        result = call_linear_api({"query": query, "variables": variables})
+        issues.extend(
+            result[f"branch{i}"] for i in range(len(chunk)) if result[f"branch{i}"]
+        )
+    return issues
+
+
+def get_issue_by_branch_name(branch_name: str) -> dict[str, Any] | None:
+    cached_issue = lookup_branch(branch_name)
+    if cached_issue is not None:
+        return cached_issue
+
+    issues = get_issues_by_branch_names([branch_name])
+    return issues[0] if issues else None
+
+
+def update_issues_state(
+    issue_ids: list[str], state_id: str
+) -> tuple[list[dict[str, Any]], list[dict[str, str]]]:
+    """
+    Move issues to `state_id` with aliased issueUpdate mutations, BATCH_SIZE per request.
+
+    Returns the updated issues and `{"id", "error"}` for each issue that failed.
+    A failing alias or request does not stop the remaining updates. The cache is
+    updated with the new states, as its index answers lookups without refetching.
+    """
+    updated: list[dict[str, Any]] = []
+    failed: list[dict[str, str]] = []
+    for start in range(0, len(issue_ids), BATCH_SIZE):
+        chunk = issue_ids[start : start + BATCH_SIZE]
+        variable_definitions = ", ".join(
+            ["$stateId: String!", *(f"$issue{i}: String!" for i in range(len(chunk)))]
+        )
+        selections = "\n".join(
+            f"issue{i}: issueUpdate(id: $issue{i}, input: {{ stateId: $stateId }}) "
+            f"{{ success issue {{ {ISSUE_FIELDS} }} }}"
+            for i in range(len(chunk))
+        )
+        mutation = f"mutation ({variable_definitions}) {{ {selections} }}"
+        variables = {
+            "stateId": state_id,
+            **{f"issue{i}": issue_id for i, issue_id in enumerate(chunk)},
+        }
+
+        try:
+            result, errors = call_linear_api_partial(
+                {"query": mutation, "variables": variables}
+            )
+        except Exception as e:
+            result, errors = {}, [{"message": str(e)}]
+
+        # Errors of one alias carry its name as the first path element
+        alias_errors = {
+            str(error["path"][0]): str(error.get("message", "Unknown API error"))
+            for error in errors
+            if error.get("path")
+        }
+        request_error = next(
+            (str(error.get("message")) for error in errors if not error.get("path")),
+            "Unknown API error",
+        )
+        for i, issue_id in enumerate(chunk):
+            response = result.get(f"issue{i}")
+            if response and response["success"]:
+                updated.append(response["issue"])
+            else:
+                failed.append(
+                    {"id": issue_id, "error": alias_errors.get(f"issue{i}", request_error)}
+                )
+
+    if TEAM_ID:
+        update_cached_issues(TEAM_ID, state_id, updated)
+    return updated, failed
+
+
 def _identifier_to_number(identifier: str) -> int:
     """Accept either 'ENG-123' or '123' and return the issue number."""
     tail = identifier.rsplit("-", 1)[-1]
@@ -228,6 +468,12 @@ def create_issue(
                 title
                 branchName
                 url
+                creator {
+                    name
+                }
+                state {
+                    name
+                }
             }
         }
     }
@@ -260,6 +506,8 @@ def create_issue(
         return None
 
     issue = cast(dict[str, Any], issue_create_response["issue"])
+    if TEAM_ID:
+        add_issue(TEAM_ID, issue)
     if not quiet:
         print(
             f"Issue created successfully. Title: {issue['title']}, Branch: {issue['branchName']}, URL: {issue['url']}"
@@ -269,38 +517,151 @@ def create_issue(
     return issue
 
 
+def fetch_pages(
+    query_name: str,
+    query: str,
+    variables: dict[str, Any],
+    get_connection: Callable[[dict[str, Any]], dict[str, Any]],
+    limit: int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Follow a connection's cursor until `limit` nodes (or all of them) are fetched.
+
+    Each page is sized by what was learned about `query_name`'s complexity, and
+    shrunk and retried if Linear rejects it as too complex.
+    """
+    nodes: list[dict[str, Any]] = []
+    cursor: str | None = None
+
+    while limit is None or len(nodes) < limit:
+        page_size = get_page_size(query_name)
+        if limit is not None:
+            page_size = min(page_size, limit - len(nodes))
+
+        request_data = {
+            "query": query,
+            "variables": {**variables, "first": page_size, "after": cursor},
+        }
+        try:
+            result, complexity = post_linear_api(request_data)
+        except QueryTooComplexError:
+            if page_size <= MIN_PAGE_SIZE:
+                raise
+            record_too_complex(query_name, page_size)
+            continue
+
+        if complexity is not None:
+            record_complexity(query_name, page_size, complexity)
+
+        connection = get_connection(result)
+        if "edges" in connection:
+            nodes.extend(edge["node"] for edge in connection["edges"])
+        else:
+            nodes.extend(connection["nodes"])
+
+        if not connection["pageInfo"]["hasNextPage"]:
+            break
+        cursor = connection["pageInfo"]["endCursor"]
+
+    return nodes if limit is None else nodes[:limit]
+
+
 def call_linear_api(request_data: dict[str, Any]) -> dict[str, Any]:
-    LINEAR_API_TOKEN = os.environ.get("LINEAR_API_TOKEN")
+    try:
+        result, _complexity = post_linear_api(request_data)
+    except QueryTooComplexError as e:
+        # Only fetch_pages can shrink a query, so this is a plain API error here
+        print(f"Error calling {API_ENDPOINT}", file=sys.stderr)
+        print(e.args[0], file=sys.stderr)
+        raise Exception("Unknown API error") from e
+    return result
 
-    if not LINEAR_API_TOKEN:
-        load_dotenv(dotenv_path=DOTFILE_PATH)
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"{LINEAR_API_TOKEN}",
-    }
 
-    api_endpoint = "https://api.linear.app/graphql"
+def _memo_key(request_data: dict[str, Any]) -> str:
+    query = " ".join(request_data["query"].split())
+    return json.dumps([query, request_data.get("variables")], sort_keys=True)
 
-    with Progress(
-        SpinnerColumn(), TextColumn("[progress.description]{task.description}")
-    ) as progress:
-        progress.add_task(description="Pouring gin... 🍸", total=False)
-        response = requests.post(
-            api_endpoint, data=json.dumps(request_data), headers=headers
-        )
 
-    response_data = response.json()
+def invalidate_memo(mutation: str) -> None:
+    """Forget memoized queries that read an entity written by `mutation`."""
+    entities = set(MUTATED_ENTITY_PATTERN.findall(mutation))
+    with _memo_lock:
+        for key in list(_memo):
+            query = json.loads(key)[0].lower()
+            if any(entity.lower() in query for entity in entities):
+                del _memo[key]
+
+
+def post_linear_api(request_data: dict[str, Any]) -> tuple[dict[str, Any], int | None]:
+    """
+    Call the API and return the data along with Linear's reported complexity.
+
+    Queries are made at most once per process; mutations always go through and
+    invalidate the memoized queries they affect.
+    """
+    if request_data["query"].lstrip().startswith("mutation"):
+        try:
+            return _request_linear_api(request_data)
+        finally:
+            invalidate_memo(request_data["query"])
+
+    key = _memo_key(request_data)
+    with _memo_lock:
+        future = _memo.get(key)
+        is_owner = future is None
+        if future is None:
+            future = Future()
+            _memo[key] = future
+
+    if is_owner:
+        try:
+            future.set_result(_request_linear_api(request_data))
+        except BaseException as e:
+            with _memo_lock:
+                _memo.pop(key, None)
+            future.set_exception(e)
+
+    # Callers get their own copy, so mutating a result never alters the memo
+    return copy.deepcopy(future.result())
+
+
+def call_linear_api_partial(
+    request_data: dict[str, Any],
+) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    """
+    Call the API without failing on errors, for requests with several aliases.
+
+    Returns the data of the aliases that succeeded and the list of errors.
+    """
+    try:
+        response_data, _complexity = _send_linear_api(request_data)
+    finally:
+        if request_data["query"].lstrip().startswith("mutation"):
+            invalidate_memo(request_data["query"])
+    return response_data.get("data") or {}, response_data.get("errors", [])
+
+
+def _request_linear_api(
+    request_data: dict[str, Any],
+) -> tuple[dict[str, Any], int | None]:
+    response_data, complexity = _send_linear_api(request_data)
 
     if "errors" in response_data:
-        print(f"Error calling {api_endpoint}")
-        print(response_data["errors"])
+        if any(
+            "too complex" in str(error.get("message", "")).lower()
+            for error in response_data["errors"]
+        ):
+            raise QueryTooComplexError(response_data["errors"])
+
+        print(f"Error calling {API_ENDPOINT}", file=sys.stderr)
+        print(response_data["errors"], file=sys.stderr)
         try:
             if (
                 response_data["errors"][0]["extensions"]["code"]
                 == "AUTHENTICATION_ERROR"
             ):
                 clear_env_key("LINEAR_API_TOKEN")
-            print("Invalid API token")
+            print("Invalid API token", file=sys.stderr)
             raise typer.Exit()
         except Exception:
             pass
@@ -308,4 +669,34 @@ def call_linear_api(request_data: dict[str, Any]) -> dict[str, Any]:
         raise Exception("Unknown API error")
 
     result = response_data["data"]
-    return cast(dict[str, Any], result)
+    return cast(dict[str, Any], result), complexity
+
+
+def _send_linear_api(
+    request_data: dict[str, Any],
+) -> tuple[dict[str, Any], int | None]:
+    """Send a request and return the raw response body and Linear's complexity."""
+    LINEAR_API_TOKEN = os.environ.get("LINEAR_API_TOKEN")
+
+    if not LINEAR_API_TOKEN:
+        load_dotenv(dotenv_path=DOTFILE_PATH)
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"{LINEAR_API_TOKEN}",
+    }
+
+    # The spinner goes to stderr so that --json and batch output stay parseable
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        console=Console(stderr=True),
+    ) as progress:
+        progress.add_task(description="Pouring gin... 🍸", total=False)
+        response = session.post(
+            API_ENDPOINT, data=json.dumps(request_data), headers=headers
+        )
+
+    response_data = response.json()
+    complexity_header = response.headers.get("X-Complexity")
+    complexity = int(complexity_header) if complexity_header else None
+    return cast(dict[str, Any], response_data), complexity
@@ -1,38 +1,92 @@
 # /usr/bin/env python3
+import fcntl
+import os
+import sys
+import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
+from typing import IO, Any
 
 from dotenv import get_key, set_key, unset_key
 
 DOTFILE_PATH = Path.home() / ".ginear"
+CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "ginear"
+)
+# Guards read-modify-write cycles of DOTFILE_PATH across processes
+CONFIG_LOCK_PATH = CACHE_DIR / "config.lock"
+
+
+@contextmanager
+def file_lock(path: Path, blocking: bool = True) -> Iterator[bool]:
+    """
+    Hold an exclusive lock on `path` for the duration of the block.
+
+    Yields whether the lock was acquired, which is only False when `blocking` is
+    False and another process holds it. Locks are not reentrant.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as lock_file:
+        try:
+            fcntl.flock(
+                lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            )
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def atomic_write(path: Path, data: str | bytes) -> None:
+    """Write via a temporary file and rename, so readers never see partial data."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data.encode() if isinstance(data, str) else data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
 
 
 def write_to_env(key: str, value: str) -> None:
-    set_key(DOTFILE_PATH, key, value)
+    # set_key itself replaces the file atomically
+    with file_lock(CONFIG_LOCK_PATH):
+        set_key(DOTFILE_PATH, key, value)
     print(f"🍸 {key}={value} written to {DOTFILE_PATH}")
 
 
 def append_or_remove_env_list(key: str, value: str) -> None:
-    original_str = get_key(DOTFILE_PATH, key) or ""
+    with file_lock(CONFIG_LOCK_PATH):
+        original_str = get_key(DOTFILE_PATH, key) or ""
 
-    items = original_str.split(",")
-    items = [item.strip() for item in items if item]
+        items = original_str.split(",")
+        items = [item.strip() for item in items if item]
 
-    if value in items:
-        items.remove(value)
-    else:
-        items.append(value)
+        if value in items:
+            items.remove(value)
+        else:
+            items.append(value)
 
-    # Join the list back into a comma-separated string
-    updated_str = ",".join(items)
+        # Join the list back into a comma-separated string
+        updated_str = ",".join(items)
 
-    write_to_env(key, updated_str)
+        set_key(DOTFILE_PATH, key, updated_str)
+    print(f"🍸 {key}={updated_str} written to {DOTFILE_PATH}")
 
 
 def clear_env_key(key: str) -> None:
-    unset_key(DOTFILE_PATH, key)
+    with file_lock(CONFIG_LOCK_PATH):
+        unset_key(DOTFILE_PATH, key)
 
 
-def switch_branch(branch_name: str) -> None:
+def switch_branch(branch_name: str, stdout: IO[Any] | None = None) -> None:
+    """Switch to `branch_name`, creating it if needed. git's output goes to `stdout`."""
     import subprocess
 
     try:
@@ -44,12 +98,14 @@ def switch_branch(branch_name: str) -> None:
 
         if branch_exists.returncode == 0:
             # Branch exists, switch to it
-            subprocess.run(["git", "switch", branch_name], check=True)
+            subprocess.run(["git", "switch", branch_name], stdout=stdout, check=True)
         else:
             # Branch does not exist, create and switch to it
-            subprocess.run(["git", "switch", "-c", branch_name], check=True)
+            subprocess.run(
+                ["git", "switch", "-c", branch_name], stdout=stdout, check=True
+            )
     except subprocess.CalledProcessError as e:
-        print(f"Error: {e}")
+        print(f"Error: {e}", file=sys.stderr)
 
 
 def git_commit(msg: str) -> None:
@@ -59,4 +115,41 @@ def git_commit(msg: str) -> None:
         # Branch does not exist, create and switch to it
         subprocess.run(["git", "commit", "-m", msg], check=True)
     except subprocess.CalledProcessError as e:
-        print(f"Error: {e}")
+        print(f"Error: {e}", file=sys.stderr)
+
+
+def get_merged_branches(base: str) -> list[str]:
+    """Local branches merged into `base`, except the one currently checked out."""
+    import subprocess
+
+    result = subprocess.run(
+        [
+            "git",
+            "for-each-ref",
+            "--merged",
+            base,
+            "--format=%(HEAD)%(refname:short)",
+            "refs/heads",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    return [
+        line.strip()
+        for line in result.stdout.splitlines()
+        if line.strip() and not line.startswith("*")
+    ]
+
+
+def get_current_branch() -> str | None:
+    import subprocess
+
+    result = subprocess.run(
+        ["git", "branch", "--show-current"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return result.stdout.strip() or None